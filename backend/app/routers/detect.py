@@ -1,19 +1,25 @@
-import base64
 import logging
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import ScanSession
 from app.schemas.scan_item import (
+    MAX_IMAGE_BYTES,
     ImageDetectionRequest,
     ImageDetectionResponse,
     DetectionResult,
 )
-from app.services.ollama_service import ollama_service
+from app.services.ollama_service import (
+    OllamaDetectionResult,
+    OllamaService,
+    get_ollama_service,
+    prepare_image,
+)
 from app.services.inventory_service import InventoryService
 from app.services.session_service import SessionService
 
@@ -23,62 +29,74 @@ router = APIRouter(prefix="/sessions/{session_id}/scan", tags=["detect"])
 
 
 @router.post("/detect-from-image", response_model=ImageDetectionResponse)
-def detect_from_image(
+async def detect_from_image(
     session_id: UUID,
     request: ImageDetectionRequest,
     db: Session = Depends(get_db),
+    ollama_service: OllamaService = Depends(get_ollama_service),
 ):
     """
     Detect products from image using Ollama Llava-Phi3.
 
     Returns list of potential product matches from inventory.
     """
-    # Verify session exists
-    session = db.query(ScanSession).filter(ScanSession.id == session_id).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
+    return await _detect(
+        db, ollama_service, session_id, request.image_bytes, request.image_base64
+    )
 
-    if session.status != "active":
-        raise HTTPException(status_code=400, detail="Session is not active")
 
-    try:
-        # Get all inventory items for matching
-        inventory_items = InventoryService.get_all_inventory(db)
-        inventory_names = [item.name for item in inventory_items]
+@router.post("/detect-from-image-bytes", response_model=ImageDetectionResponse)
+async def detect_from_image_bytes(
+    session_id: UUID,
+    file: UploadFile = File(..., description="Raw JPEG/PNG image"),
+    db: Session = Depends(get_db),
+    ollama_service: OllamaService = Depends(get_ollama_service),
+):
+    """
+    Detect products from a multipart image upload.
+
+    Skips the client-side base64 inflation; the image is encoded only
+    once, after downscaling, because the Ollama API requires base64.
+    """
+    raw = await file.read(MAX_IMAGE_BYTES + 1)
+    if not raw:
+        raise HTTPException(status_code=400, detail="Image cannot be empty")
+    if len(raw) > MAX_IMAGE_BYTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Image too large (max {MAX_IMAGE_BYTES / 1_000_000:g}MB)",
+        )
+
+    return await _detect(db, ollama_service, session_id, raw)
 
-        if not inventory_names:
-            raise HTTPException(
-                status_code=400,
-                detail="No inventory items available for matching"
-            )
+
+async def _detect(
+    db: Session,
+    ollama_service: OllamaService,
+    session_id: UUID,
+    image: bytes,
+    image_base64: Optional[str] = None,
+) -> ImageDetectionResponse:
+    """Run detection for a session and match results to inventory."""
+    # Database work is synchronous, keep it off the event loop
+    system_prompt = await run_in_threadpool(
+        _get_system_prompt, db, ollama_service, session_id
+    )
+
+    try:
+        # Downscale to the model's input size; CPU-bound, so off the loop too
+        image_base64 = await run_in_threadpool(prepare_image, image, image_base64)
 
         # Detect products using Ollama
-        ollama_results, processing_time = ollama_service.detect_products(
-            request.image_base64,
-            inventory_names
+        ollama_results, processing_time = await ollama_service.detect_products(
+            image_base64,
+            system_prompt,
         )
 
         # Match detected products to inventory
-        detection_results: List[DetectionResult] = []
-
-        for ollama_result in ollama_results:
-            # Find best match in inventory
-            best_match = InventoryService.match_product(
-                db,
-                ollama_result.product_name
-            )
-
-            if best_match:
-                detection_results.append(
-                    DetectionResult(
-                        inventory_id=best_match.id,
-                        name=best_match.name,
-                        sku=best_match.sku,
-                        confidence=ollama_result.confidence,
-                        quantity=ollama_result.quantity,
-                        matched_from=ollama_result.product_name,
-                    )
-                )
+        detection_results = await run_in_threadpool(
+            _match_results, db, ollama_results
+        )
 
         return ImageDetectionResponse(
             results=detection_results,
@@ -98,3 +116,66 @@ def detect_from_image(
     except Exception as e:
         logger.error(f"Unexpected error during detection: {e}")
         raise HTTPException(status_code=500, detail="Detection failed")
+
+
+def _get_system_prompt(
+    db: Session, ollama_service: OllamaService, session_id: UUID
+) -> str:
+    """Verify the session is active and get the inventory prompt."""
+
+    def load_names() -> List[str]:
+        inventory_names = InventoryService.list_names(db)
+        if not inventory_names:
+            raise HTTPException(
+                status_code=400,
+                detail="No inventory items available for matching"
+            )
+        return inventory_names
+
+    try:
+        # Verify session exists
+        session = db.query(ScanSession).filter(ScanSession.id == session_id).first()
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        if session.status != "active":
+            raise HTTPException(status_code=400, detail="Session is not active")
+
+        # Names are only loaded when this inventory version has no cached
+        # prompt yet. The version is read first so a concurrent write can
+        # never be cached under a newer version.
+        return ollama_service.get_system_prompt(
+            InventoryService.get_version(), load_names
+        )
+    finally:
+        # End the read transaction so the pooled connection is not held
+        # idle in transaction while we wait on Ollama
+        db.rollback()
+
+
+def _match_results(
+    db: Session, ollama_results: List[OllamaDetectionResult]
+) -> List[DetectionResult]:
+    """Match detected products to inventory."""
+    detection_results: List[DetectionResult] = []
+
+    for ollama_result in ollama_results:
+        # Find best match in inventory
+        best_match = InventoryService.match_product(
+            db,
+            ollama_result.product_name
+        )
+
+        if best_match:
+            detection_results.append(
+                DetectionResult(
+                    inventory_id=best_match.id,
+                    name=best_match.name,
+                    sku=best_match.sku,
+                    confidence=ollama_result.confidence,
+                    quantity=ollama_result.quantity,
+                    matched_from=ollama_result.product_name,
+                )
+            )
+
+    return detection_results
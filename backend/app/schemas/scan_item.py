@@ -1,9 +1,21 @@
+import binascii
 from datetime import datetime
 from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+import pybase64
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    field_validator,
+    model_validator,
+)
+
+MAX_IMAGE_BASE64_LENGTH = 5_000_000  # 5MB limit
+MAX_IMAGE_BYTES = MAX_IMAGE_BASE64_LENGTH * 3 // 4  # Same limit, decoded
 
 
 class ScanProductRequest(BaseModel):
@@ -52,18 +64,34 @@ class ImageDetectionRequest(BaseModel):
 
     image_base64: str = Field(..., description="Base64 encoded JPEG/PNG image")
 
+    _image_bytes: bytes = PrivateAttr(default=b"")
+
     @field_validator('image_base64')
     @classmethod
     def validate_image(cls, v):
         if not v:
             raise ValueError("Image cannot be empty")
-        if len(v) > 5_000_000:  # 5MB limit
+        # Bound the work before decoding anything
+        if len(v) > MAX_IMAGE_BASE64_LENGTH:
             raise ValueError("Image too large (max 5MB)")
-        # Basic validation that it looks like base64
-        if not all(c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=' for c in v):
-            raise ValueError("Invalid base64 encoding")
         return v
 
+    @model_validator(mode='after')
+    def decode_image(self):
+        # Single SIMD decode doubles as the base64 validity check
+        try:
+            self._image_bytes = pybase64.b64decode(
+                self.image_base64, validate=True
+            )
+        except (binascii.Error, ValueError):
+            raise ValueError("Invalid base64 encoding")
+        return self
+
+    @property
+    def image_bytes(self) -> bytes:
+        """Decoded image bytes, cached from validation."""
+        return self._image_bytes
+
 
 class DetectionResult(BaseModel):
     """Single product detection result."""
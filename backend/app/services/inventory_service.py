@@ -1,18 +1,90 @@
+import time
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional
 from uuid import UUID
 
-from difflib import SequenceMatcher
+from rapidfuzz import fuzz, process
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.models import InventoryMaster
 from app.schemas.inventory import InventoryCreateRequest, InventoryUpdateRequest
 from config import config
 
+# RapidFuzz scores are 0-100; config is frozen, so compute this once
+_FUZZY_SCORE_CUTOFF = config.FUZZY_MATCH_THRESHOLD * 100
+
+
+class _InventoryCorpus(NamedTuple):
+    """Match targets, materialized once per inventory version."""
+
+    # SKUs keep their stored case; everything else is lowercased
+    sku_lookup: Dict[str, UUID]
+    names: List[str]
+    name_ids: List[UUID]
+    aliases: List[str]
+    alias_ids: List[UUID]
+    exact_lookup: Dict[str, UUID]
+
 
 class InventoryService:
     """Service layer for inventory operations."""
 
+    # Bumped on every write that can change SKUs, names or aliases
+    _version: int = 0
+    _version_time: float = time.monotonic()
+    _corpus_cache: Dict[int, _InventoryCorpus] = {}
+
+    @classmethod
+    def get_version(cls) -> int:
+        """Get the current inventory version, for caching derived data."""
+        # Writes made by other worker processes never bump our counter
+        if time.monotonic() - cls._version_time > config.INVENTORY_CACHE_TTL:
+            cls._bump_version()
+        return cls._version
+
+    @classmethod
+    def _bump_version(cls) -> None:
+        """Invalidate state derived from inventory names and aliases."""
+        cls._version += 1
+        cls._version_time = time.monotonic()
+
+    @classmethod
+    def _get_corpus(cls, db: Session) -> _InventoryCorpus:
+        """Get the match corpus for the current inventory version."""
+        version = cls.get_version()
+        corpus = cls._corpus_cache.get(version)
+        if corpus is not None:
+            return corpus
+
+        sku_lookup: Dict[str, UUID] = {}
+        names, name_ids = [], []
+        aliases, alias_ids = [], []
+        rows = db.query(
+            InventoryMaster.id,
+            InventoryMaster.sku,
+            InventoryMaster.name,
+            InventoryMaster.aliases,
+        ).all()
+        for item_id, sku, name, item_aliases in rows:
+            sku_lookup.setdefault(sku, item_id)
+            names.append(name.lower())
+            name_ids.append(item_id)
+            for alias in item_aliases or ():
+                aliases.append(alias.lower())
+                alias_ids.append(item_id)
+
+        # Names are inserted first so they take precedence over aliases
+        exact_lookup: Dict[str, UUID] = {}
+        for key, item_id in zip(names + aliases, name_ids + alias_ids):
+            exact_lookup.setdefault(key, item_id)
+
+        corpus = _InventoryCorpus(
+            sku_lookup, names, name_ids, aliases, alias_ids, exact_lookup
+        )
+        cls._corpus_cache = {version: corpus}
+        return corpus
+
     @staticmethod
     def create_inventory(
         db: Session, request: InventoryCreateRequest
@@ -34,26 +106,62 @@ class InventoryService:
         db.add(item)
         db.commit()
         db.refresh(item)
+        InventoryService._bump_version()
         return item
 
     @staticmethod
     def get_inventory(db: Session, inventory_id: UUID) -> Optional[InventoryMaster]:
         """Get inventory item by ID."""
-        return db.query(InventoryMaster).filter_by(id=inventory_id).first()
+        # Session.get checks the identity map before querying
+        return db.get(InventoryMaster, inventory_id)
 
     @staticmethod
-    def list_inventory(db: Session, limit: int = 100, offset: int = 0) -> tuple:
-        """List all inventory items."""
+    def list_inventory(
+        db: Session, limit: int = 100, offset: int = 0, exact: bool = False
+    ) -> tuple:
+        """
+        List all inventory items.
+
+        Unless exact is set, the total comes from the planner's row estimate
+        instead of a full-table COUNT, so it may briefly lag behind writes.
+        """
         query = db.query(InventoryMaster)
-        total = query.count()
         items = query.limit(limit).offset(offset).all()
-        return items, total
+
+        # A short page means we already know the exact total
+        if len(items) < limit and (items or offset == 0):
+            return items, offset + len(items)
+
+        total = None if exact else InventoryService._estimate_count(db)
+        if total is None:
+            total = query.count()
+        return items, max(total, offset + len(items))
+
+    @staticmethod
+    def _estimate_count(db: Session) -> Optional[int]:
+        """Get the planner's row estimate, or None if the table is unanalyzed."""
+        estimate = db.execute(
+            # to_regclass resolves the name through search_path, like the ORM
+            text(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = to_regclass(:table)"
+            ),
+            {"table": InventoryMaster.__tablename__},
+        ).scalar()
+        if estimate is None or estimate < 0:
+            return None
+        return estimate
 
     @staticmethod
     def get_all_inventory(db: Session) -> List[InventoryMaster]:
         """Get all inventory items without pagination."""
         return db.query(InventoryMaster).all()
 
+    @staticmethod
+    def list_names(db: Session) -> List[str]:
+        """Get all inventory names without loading full items."""
+        return [name for (name,) in db.query(InventoryMaster.name).all()]
+
     @staticmethod
     def update_inventory(
         db: Session, inventory_id: UUID, request: InventoryUpdateRequest
@@ -76,6 +184,7 @@ class InventoryService:
 
         db.commit()
         db.refresh(item)
+        InventoryService._bump_version()
         return item
 
     @staticmethod
@@ -91,56 +200,44 @@ class InventoryService:
         5. Return None if no match
         """
         detected_lower = detected_name.lower().strip()
+        corpus = InventoryService._get_corpus(db)
 
-        # 1. Exact SKU match
-        item = db.query(InventoryMaster).filter_by(sku=detected_lower).first()
-        if item:
-            return item
+        # 1. Exact SKU match (case-sensitive against the stored SKU)
+        item_id = corpus.sku_lookup.get(detected_lower)
+        if item_id is None:
+            # 2-3. Exact name or alias match, one lookup before any scoring
+            item_id = corpus.exact_lookup.get(detected_lower)
+        if item_id is not None:
+            return InventoryService.get_inventory(db, item_id)
 
-        # 2. Exact name match (case-insensitive)
-        item = (
-            db.query(InventoryMaster)
-            .filter(InventoryMaster.name.ilike(detected_lower))
-            .first()
-        )
-        if item:
-            return item
-
-        # 3. Alias match
-        all_items = db.query(InventoryMaster).all()
-        for item in all_items:
-            if item.aliases:
-                for alias in item.aliases:
-                    if alias.lower() == detected_lower:
-                        return item
-
-        # 4. Fuzzy match
-        best_match = None
+        # 4. Fuzzy match (bit-parallel C++ scorer via RapidFuzz)
+        best_id = None
         best_score = 0.0
 
-        for item in all_items:
-            # Try matching against name
-            score = SequenceMatcher(
-                None, detected_lower, item.name.lower()
-            ).ratio()
-            if score > best_score:
-                best_score = score
-                best_match = item
-
-            # Try matching against aliases
-            if item.aliases:
-                for alias in item.aliases:
-                    score = SequenceMatcher(
-                        None, detected_lower, alias.lower()
-                    ).ratio()
-                    if score > best_score:
-                        best_score = score
-                        best_match = item
-
-        if best_score >= config.FUZZY_MATCH_THRESHOLD:
-            return best_match
-
-        return None
+        match = process.extractOne(
+            detected_lower,
+            corpus.names,
+            scorer=fuzz.ratio,
+            score_cutoff=_FUZZY_SCORE_CUTOFF,
+        )
+        if match:
+            _, best_score, index = match
+            best_id = corpus.name_ids[index]
+
+        match = process.extractOne(
+            detected_lower,
+            corpus.aliases,
+            scorer=fuzz.ratio,
+            score_cutoff=_FUZZY_SCORE_CUTOFF,
+        )
+        if match and match[1] > best_score:
+            _, best_score, index = match
+            best_id = corpus.alias_ids[index]
+
+        if best_id is None:
+            return None
+
+        return InventoryService.get_inventory(db, best_id)
 
     @staticmethod
     def update_stock(
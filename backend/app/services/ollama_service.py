@@ -1,12 +1,30 @@
-import base64
-import json
+import asyncio
 import logging
-from typing import List, Optional
-import requests
+import re
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import orjson
+import pybase64
+from fastapi import Request
+from PIL import Image
+
 from config import config
 
 logger = logging.getLogger(__name__)
 
+# Keep connections to Ollama open across requests
+_CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+_USER_PROMPT = "Analyze this image and identify products from our inventory."
+
+# Fallback for models that wrap the JSON object in prose
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# Reject oversized frames from the header alone, before any pixels are decoded
+_MAX_IMAGE_PIXELS = 4096 * 4096
+
 
 class OllamaDetectionResult:
     """Result from Ollama detection."""
@@ -22,12 +40,31 @@ class OllamaService:
     def __init__(self, endpoint: str = None, model: str = None):
         self.endpoint = endpoint or config.OLLAMA_ENDPOINT
         self.model = model or config.OLLAMA_MODEL
-        self.api_url = f"{self.endpoint}/api/generate"
+        self._prompt_cache: Dict[int, str] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        # Caps in-flight calls at Ollama's parallel slots; a slot is reused
+        # as soon as any call finishes
+        self._slots = asyncio.Semaphore(config.OLLAMA_MAX_CONCURRENCY)
+
+    async def start(self) -> None:
+        """Open the pooled HTTP client. Called from the app lifespan."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.endpoint,
+                timeout=config.OLLAMA_TIMEOUT,
+                limits=_CLIENT_LIMITS,
+            )
 
-    def build_inventory_prompt(self, inventory_names: List[str]) -> str:
-        """Build prompt with inventory context."""
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client. Called from the app lifespan."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def build_system_prompt(self, inventory_names: List[str]) -> str:
+        """Build the system prompt with inventory context."""
         inventory_str = ", ".join(inventory_names)
-        prompt = f"""Analyze this image and identify products from our inventory.
+        prompt = f"""You identify products from our inventory in images.
 
 Available products: {inventory_str}
 
@@ -45,74 +82,115 @@ Be strict - only report products you're confident about.
 If no products detected, return {{"products": []}}"""
         return prompt
 
-    def detect_products(
+    def get_system_prompt(
+        self, inventory_version: int, load_names: Callable[[], List[str]]
+    ) -> str:
+        """
+        Get the system prompt for an inventory version.
+
+        load_names is only called on a cache miss, so repeat requests for an
+        unchanged inventory skip loading names entirely.
+        """
+        prompt = self._prompt_cache.get(inventory_version)
+        if prompt is None:
+            inventory_names = load_names()
+            if not inventory_names:
+                raise ValueError("Inventory list cannot be empty")
+            prompt = self.build_system_prompt(inventory_names)
+            # Only the current version is ever requested again
+            self._prompt_cache = {inventory_version: prompt}
+        return prompt
+
+    async def detect_products(
         self,
         image_base64: str,
-        inventory_names: List[str]
+        system_prompt: str,
     ) -> tuple[List[OllamaDetectionResult], int]:
         """
         Detect products in image using Ollama Llava-Phi3.
 
+        system_prompt carries the inventory context, see get_system_prompt.
+
         Returns: (results, processing_time_ms)
-        Raises: ValueError for invalid input, requests.RequestException for API errors
+        Raises: ValueError for invalid input, ConnectionError if Ollama is
+        unreachable, httpx.HTTPError for other API errors
         """
         if not image_base64:
             raise ValueError("Image base64 cannot be empty")
 
-        if not inventory_names:
-            raise ValueError("Inventory list cannot be empty")
+        if not system_prompt:
+            raise ValueError("System prompt cannot be empty")
 
-        prompt = self.build_inventory_prompt(inventory_names)
+        if self._client is None:
+            raise RuntimeError("OllamaService has not been started")
 
-        try:
-            response = requests.post(
-                self.api_url,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
+        # The inventory lives in a fixed system message ahead of the image so
+        # Ollama can reuse the cached prefix across requests
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": system_prompt,
+                },
+                {
+                    "role": "user",
+                    "content": _USER_PROMPT,
                     "images": [image_base64],
-                    "stream": False,
                 },
-                timeout=config.OLLAMA_TIMEOUT,
-            )
-            response.raise_for_status()
+            ],
+            "format": "json",
+            "stream": False,
+        }
 
-            data = response.json()
+        # Concurrent calls share Ollama's slots, which batch them server-side
+        async with self._slots:
+            data = await self._chat(payload)
 
-            # Parse response to extract products
-            response_text = data.get("response", "")
-            results = self._parse_response(response_text)
+        # Parse response to extract products
+        response_text = data.get("message", {}).get("content", "")
+        results = self._parse_response(response_text)
 
-            # Get processing time in milliseconds
-            eval_duration = data.get("eval_duration", 0)
-            processing_time_ms = eval_duration // 1_000_000  # Convert nanoseconds to ms
+        # Get processing time in milliseconds
+        eval_duration = data.get("eval_duration", 0)
+        processing_time_ms = eval_duration // 1_000_000  # Convert nanoseconds to ms
 
-            return results, processing_time_ms
+        return results, processing_time_ms
 
-        except requests.exceptions.Timeout:
+    async def _chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a chat request to Ollama and return the decoded body."""
+        try:
+            # orjson handles the multi-MB base64 image field in C
+            response = await self._client.post(
+                "/api/chat",
+                content=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"},
+            )
+            response.raise_for_status()
+            return orjson.loads(response.content)
+
+        except httpx.TimeoutException:
             logger.error("Ollama request timed out")
             raise
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError as e:
             logger.error(f"Failed to connect to Ollama at {self.endpoint}")
-            raise
-        except requests.exceptions.RequestException as e:
+            raise ConnectionError(str(e)) from e
+        except httpx.HTTPError as e:
             logger.error(f"Ollama API error: {e}")
             raise
 
     def _parse_response(self, response_text: str) -> List[OllamaDetectionResult]:
         """Parse Ollama response and extract products."""
         try:
-            # Try to extract JSON from response
-            # Look for { and } markers
-            start = response_text.find("{")
-            end = response_text.rfind("}") + 1
-
-            if start == -1 or end == 0:
-                logger.warning(f"No JSON found in response: {response_text[:200]}")
-                return []
-
-            json_str = response_text[start:end]
-            data = json.loads(json_str)
+            # JSON mode makes the whole response a JSON document
+            try:
+                data = orjson.loads(response_text)
+            except orjson.JSONDecodeError:
+                match = _JSON_OBJECT_RE.search(response_text)
+                if not match:
+                    logger.warning(f"No JSON found in response: {response_text[:200]}")
+                    return []
+                data = orjson.loads(match.group())
 
             results = []
             for product in data.get("products", []):
@@ -130,7 +208,7 @@ If no products detected, return {{"products": []}}"""
 
             return results
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.warning(f"Failed to parse Ollama response as JSON: {e}")
             return []
         except Exception as e:
@@ -138,5 +216,43 @@ If no products detected, return {{"products": []}}"""
             return []
 
 
-# Singleton instance
-ollama_service = OllamaService()
+def prepare_image(
+    raw: bytes, image_base64: Optional[str] = None, max_size: int = None
+) -> str:
+    """
+    Downscale an image for the vision model and return it base64 encoded.
+
+    The model resizes inputs to a few hundred pixels anyway, so sending
+    full-resolution frames only costs bandwidth and prefill time. Pass
+    image_base64 when the caller already has raw encoded, so small images
+    are forwarded without re-encoding.
+    Raises: ValueError if the bytes are not a readable image or exceed
+    4096x4096 pixels
+    """
+    max_size = max_size or config.OLLAMA_IMAGE_MAX_SIZE
+    try:
+        image = Image.open(BytesIO(raw))
+        if image.width * image.height > _MAX_IMAGE_PIXELS:
+            raise ValueError("Image dimensions too large")
+        if max(image.size) <= max_size:
+            if image_base64 is not None:
+                return image_base64
+            return pybase64.b64encode(raw).decode("ascii")
+
+        # Convert first: palette and 1-bit modes would force a NEAREST resize.
+        # RGB and L JPEGs skip this and keep draft-mode scaling during decode
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.thumbnail((max_size, max_size), Image.BILINEAR)
+
+        buffer = BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError("Invalid image") from e
+
+    return pybase64.b64encode(buffer.getbuffer()).decode("ascii")
+
+
+def get_ollama_service(request: Request) -> OllamaService:
+    """Get the lifespan-managed Ollama service."""
+    return request.app.state.ollama_service
@@ -1,13 +1,24 @@
 import os
-from typing import List
+from dataclasses import dataclass
+from typing import Tuple
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+def _parse_origins(value: str) -> Tuple[str, ...]:
+    """Split a comma-separated origin list, validating each entry once."""
+    origins = tuple(origin.strip() for origin in value.split(",") if origin.strip())
+    for origin in origins:
+        if origin != "*" and not origin.startswith(("http://", "https://")):
+            raise ValueError(f"Invalid CORS origin: {origin!r}")
+    return origins
+
+
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Application configuration."""
+    """Application configuration, read once at import and immutable after."""
 
     # Database
     DATABASE_URL: str = os.getenv(
@@ -19,24 +30,34 @@ class Config:
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
     API_TITLE: str = "VisionScan POS API"
     API_VERSION: str = "1.0.0"
+    # Server processes; ignored when DEBUG enables auto-reload. Each worker
+    # has its own DB pool and Ollama concurrency limit, so keep this small
+    WORKERS: int = int(os.getenv("WORKERS", "2"))
 
     # CORS
-    CORS_ORIGINS: List[str] = os.getenv(
-        "CORS_ORIGINS", "http://localhost:5173,http://localhost:3000"
-    ).split(",")
+    CORS_ORIGINS: Tuple[str, ...] = _parse_origins(
+        os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000")
+    )
 
     # Fuzzy matching threshold (0-1)
     FUZZY_MATCH_THRESHOLD: float = 0.6
+    # Max age of per-worker inventory caches, since other workers' writes
+    # are not seen locally
+    INVENTORY_CACHE_TTL: int = int(os.getenv("INVENTORY_CACHE_TTL", "30"))
 
     # Ollama Configuration
     OLLAMA_ENDPOINT: str = os.getenv("OLLAMA_ENDPOINT", "http://localhost:11434")
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llava-phi3")
     OLLAMA_TIMEOUT: int = int(os.getenv("OLLAMA_TIMEOUT", "30"))
+    # Longest image side sent to the model; larger images are downscaled
+    OLLAMA_IMAGE_MAX_SIZE: int = int(os.getenv("OLLAMA_IMAGE_MAX_SIZE", "448"))
+    # Max concurrent Ollama calls per worker; WORKERS x this should not
+    # exceed OLLAMA_NUM_PARALLEL
+    OLLAMA_MAX_CONCURRENCY: int = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
 
-    @classmethod
-    def get_database_url(cls) -> str:
+    def get_database_url(self) -> str:
         """Get database URL."""
-        return cls.DATABASE_URL
+        return self.DATABASE_URL
 
 
 config = Config()
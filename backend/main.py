@@ -1,10 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 
 from app.models import Base
 from app.database import engine
 from app.routers import sessions, inventory, checkout, detect
+from app.services.ollama_service import OllamaService
 from config import config
 
 # Create tables
@@ -16,9 +18,12 @@ Base.metadata.create_all(bind=engine)
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting VisionScan POS API...")
+    app.state.ollama_service = OllamaService()
+    await app.state.ollama_service.start()
     yield
     # Shutdown
     print("Shutting down VisionScan POS API...")
+    await app.state.ollama_service.aclose()
 
 
 # Initialize FastAPI app
@@ -26,6 +31,7 @@ app = FastAPI(
     title=config.API_TITLE,
     version=config.API_VERSION,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -59,5 +65,8 @@ if __name__ == "__main__":
         "main:app",
         host="0.0.0.0",
         port=8000,
+        loop="auto",  # uvloop via uvicorn[standard]; it has no Windows build
+        http="httptools",
         reload=config.DEBUG,
+        workers=1 if config.DEBUG else config.WORKERS,
     )